@@ -0,0 +1,190 @@
+import os
+import time
+import argparse
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from ML.ML_model.Forecasting import (
+    FEATURES, EXOG, WINDOW, HORIZON, load_data, build_features,
+    make_regressor, recursive_forecast, fit_direct_models, direct_forecast,
+    check_direct_horizon
+)
+
+# ---------------------------------------------------------
+# Rolling-origin backtesting of the AQI forecasters
+# ---------------------------------------------------------
+# Fraction of each region's history used for training; origins are
+# spread over the remainder, so no origin ever sees its training data.
+TRAIN_FRACTION = 0.8
+N_ORIGINS = 50
+
+# Horizons (in days) shown in the summary table
+REPORT_HORIZONS = [1, 7, 14, 30, 60, 90, 120, 150, 180]
+
+
+def backtest_region(task):
+    """
+    Backtest one region: train once on the rows before a cutoff date, then
+    forecast from every origin in a single batch, with either the recursive
+    forecaster or the direct bucket models.
+
+    Training uses the raw rows, exactly as /predict does. Evaluation runs
+    on a daily calendar, so horizon h is always h calendar days after the
+    origin even where the recorded history has gaps. An origin needs a
+    complete WINDOW-day AQI history and observed weather on the day before
+    it; forecast days with no recorded AQI are left out of the errors.
+
+    exog="persist" holds the weather observed on the day before each origin
+    constant over the horizon (what /predict does with user input);
+    exog="actual" feeds the observed weather for every forecast day,
+    carrying the last observation forward across gaps.
+    """
+    country, region, region_data, n_origins, horizon, exog, mode, n_jobs = task
+
+    region_data = region_data.sort_values('Date')
+    cutoff = region_data['Date'].iloc[int(len(region_data) * TRAIN_FRACTION)]
+    train = region_data[region_data['Date'] < cutoff]
+
+    daily = region_data.set_index('Date').asfreq('D')
+    aqi = daily['AQI'].to_numpy(dtype=float)
+    weather = daily[EXOG].to_numpy(dtype=float)
+
+    # Origins on or after the cutoff with a full history and a full horizon
+    # inside the calendar
+    first = max(WINDOW, daily.index.searchsorted(cutoff))
+    candidates = np.arange(first, len(daily) - horizon + 1)
+    if len(candidates) == 0:
+        return None
+    history_ok = ~np.isnan(
+        np.lib.stride_tricks.sliding_window_view(aqi, WINDOW)[candidates - WINDOW]).any(axis=1)
+    weather_ok = ~np.isnan(weather[candidates - 1]).any(axis=1)
+    candidates = candidates[history_ok & weather_ok]
+    if len(candidates) == 0:
+        return None
+
+    origins = candidates[np.unique(np.linspace(0, len(candidates) - 1, n_origins).astype(int))]
+
+    started = time.perf_counter()
+    if mode == "direct":
+        models = fit_direct_models(train)
+    else:
+        data = build_features(train)
+        model = make_regressor(n_jobs=n_jobs)
+        model.fit(data[FEATURES], data['AQI'])
+    fit_seconds = time.perf_counter() - started
+
+    history = np.stack([aqi[o - WINDOW:o] for o in origins])
+    actual = np.stack([aqi[o:o + horizon] for o in origins])
+    start_dates = daily.index[origins]
+
+    if exog == "actual":
+        observed = daily[EXOG].ffill().to_numpy(dtype=float)
+        exog_values = np.stack([observed[o:o + horizon] for o in origins])
+    else:
+        exog_values = weather[origins - 1]
+
+    started = time.perf_counter()
+    if mode == "direct":
+        forecast = direct_forecast(models, history, start_dates, exog_values, horizon=horizon)
+    else:
+        forecast = recursive_forecast(model, history, start_dates, exog_values, horizon=horizon)
+    forecast_seconds = time.perf_counter() - started
+
+    return {
+        "country": country,
+        "region": region,
+        "origins": len(origins),
+        # NaN where the forecast day has no recorded AQI
+        "errors": forecast - actual,
+        "fit_seconds": fit_seconds,
+        "forecast_seconds": forecast_seconds,
+    }
+
+
+def run_backtest(n_origins=N_ORIGINS, horizon=HORIZON, exog="persist", mode="recursive", workers=None):
+    """
+    Run the backtest for every country/region, one region per process.
+
+    Returns (by_horizon, by_region) DataFrames: MAE/RMSE for each forecast
+    day pooled across all origins, and per-region error and timings. Days
+    without a recorded AQI are skipped; "n" counts the errors behind each row.
+    """
+    if mode == "direct":
+        check_direct_horizon(horizon)
+
+    df = load_data()
+    groups = list(df.groupby(['Country', 'Region']))
+
+    workers = workers or min(len(groups), os.cpu_count() or 1)
+    # Split the cores between processes so XGBoost threads don't oversubscribe
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+
+    tasks = [
+        (country, region, region_data, n_origins, horizon, exog, mode, n_jobs)
+        for (country, region), region_data in groups
+    ]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = [r for r in pool.map(backtest_region, tasks) if r is not None]
+
+    errors = np.concatenate([r["errors"] for r in results])
+    by_horizon = pd.DataFrame({
+        "horizon": np.arange(1, horizon + 1),
+        "n": (~np.isnan(errors)).sum(axis=0),
+        "mae": np.nanmean(np.abs(errors), axis=0),
+        "rmse": np.sqrt(np.nanmean(errors ** 2, axis=0)),
+        "bias": np.nanmean(errors, axis=0),
+    })
+
+    by_region = pd.DataFrame([{
+        "country": r["country"],
+        "region": r["region"],
+        "origins": r["origins"],
+        "n": int((~np.isnan(r["errors"])).sum()),
+        "mae": np.nanmean(np.abs(r["errors"])),
+        "rmse": np.sqrt(np.nanmean(r["errors"] ** 2)),
+        "fit_s": r["fit_seconds"],
+        "forecast_s": r["forecast_seconds"],
+    } for r in results])
+
+    return by_horizon, by_region
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the AQI forecasters")
+    parser.add_argument("--origins", type=int, default=N_ORIGINS, help="origins per region")
+    parser.add_argument("--horizon", type=int, default=HORIZON)
+    parser.add_argument("--exog", choices=["persist", "actual"], default="persist")
+    parser.add_argument("--mode", choices=["recursive", "direct", "both"], default="recursive")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", help="optional CSV path for the per-horizon errors")
+    args = parser.parse_args()
+
+    modes = ["recursive", "direct"] if args.mode == "both" else [args.mode]
+    if "direct" in modes:
+        try:
+            check_direct_horizon(args.horizon)
+        except ValueError as e:
+            parser.error(str(e))
+    horizon_tables = []
+
+    for mode in modes:
+        started = time.perf_counter()
+        by_horizon, by_region = run_backtest(args.origins, args.horizon, args.exog, mode, args.workers)
+        elapsed = time.perf_counter() - started
+
+        print(f"\n[{mode}] Backtest: {by_region['origins'].sum()} origins across {len(by_region)} regions in {elapsed:.1f}s")
+        print(f"[{mode}] Mean per region: fit {by_region['fit_s'].mean():.2f}s, "
+              f"forecast {by_region['forecast_s'].mean():.3f}s")
+        print(f"\n[{mode}] Error by region (all horizons):")
+        print(by_region.round(3).to_string(index=False))
+
+        horizon_tables.append(by_horizon.set_index('horizon').add_prefix(f"{mode}_"))
+
+    by_horizon = pd.concat(horizon_tables, axis=1).reset_index()
+    print("\nError by horizon:")
+    print(by_horizon[by_horizon['horizon'].isin(REPORT_HORIZONS)].round(3).to_string(index=False))
+
+    if args.output:
+        by_horizon.to_csv(args.output, index=False)
@@ -0,0 +1,62 @@
+import time
+import threading
+from xgboost.callback import TrainingCallback
+
+# ---------------------------------------------------------
+# Cooperative cancellation for long-running model requests
+# ---------------------------------------------------------
+# Model code cannot be interrupted from outside, so it calls
+# checkpoint() between stages. The API layer cancels the token when the
+# client disconnects, and the token expires on its own at the deadline.
+
+
+class RequestCancelled(Exception):
+    """Raised at a checkpoint after the client has gone away."""
+
+
+class DeadlineExceeded(RequestCancelled):
+    """Raised at a checkpoint after the request deadline has passed."""
+
+
+class CancelToken:
+    def __init__(self, timeout=None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.stage = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self, stage):
+        self.stage = stage
+        if self._cancelled.is_set():
+            raise RequestCancelled(f"Client disconnected during {stage}")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise DeadlineExceeded(f"Request deadline exceeded during {stage}")
+
+
+def checkpoint(token, stage):
+    if token is not None:
+        token.check(stage)
+
+
+class CancelCallback(TrainingCallback):
+    """Checks the token every few boosting rounds so a fit can be abandoned."""
+
+    def __init__(self, token, every=25):
+        super().__init__()
+        self.token = token
+        self.every = every
+
+    def after_iteration(self, model, epoch, evals_log):
+        if epoch % self.every == 0:
+            self.token.check(f"fit (round {epoch})")
+        return False
+
+
+def fit_callbacks(token):
+    return [CancelCallback(token)] if token is not None else None
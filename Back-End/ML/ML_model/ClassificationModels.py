@@ -1,57 +1,79 @@
+import os
+import joblib
+import sklearn
 import pandas as pd
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import (confusion_matrix, classification_report,accuracy_score, precision_score, recall_score, f1_score)
-from sklearn.linear_model import LogisticRegression
-from sklearn.neighbors import KNeighborsClassifier
+from sklearn.metrics import (classification_report, accuracy_score, precision_score, recall_score, f1_score)
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.decomposition import PCA
 from fastapi import FastAPI
-from pydantic import BaseModel
+
+from ML.ML_model.Cancellation import checkpoint
 
 import warnings
-from sklearn.metrics import classification_report
 from sklearn.exceptions import UndefinedMetricWarning
 warnings.filterwarnings("ignore", category=UndefinedMetricWarning)
 
 app = FastAPI()
 
-@app.post("/classifier")
+# ---------------------------------------------------------
+# Persisted classifier artifact
+# ---------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACT_DIR = os.path.join(BASE_DIR, "../artifacts")
+
+# Bump whenever features, preprocessing or hyper-parameters change so a
+# stale artifact on disk is retrained instead of being reused.
+CLASSIFIER_VERSION = 2
+CLASSIFIER_PATH = os.path.join(ARTIFACT_DIR, f"aqi_classifier_v{CLASSIFIER_VERSION}.joblib")
+
+MODEL_NAME = "Random Forest Tree"
+FEATURES = ['Temperature', 'RelativeHumidity']
+
+# Rows scored per predict call (bounds peak memory on large requests)
+CLASSIFY_CHUNK_SIZE = 50_000
+
+# Lookup-grid resolution: (Temperature °C, RelativeHumidity %). The data is
+# recorded to 0.01, and coarser grids disagree with the forest noticeably
+# (0.1 x 0.2 agrees on only 86% of dataset points vs ~98.6% here).
+GRID_STEP = (0.01, 0.02)
 
-async def run_classifier():
 
+# Categorize AQI into categories
+def categorize_aqi(aqi):
+    if aqi <= 50:
+        return 'Good'
+    elif aqi <= 100:
+        return 'Moderate'
+    elif aqi <= 150:
+        return 'Unhealthy for Sensitive Groups'
+    elif aqi <= 200:
+        return 'Unhealthy'
+    elif aqi <= 300:
+        return 'Very Unhealthy'
+    else:
+        return 'Hazardous'
 
-    df = pd.read_csv("ML/data/Final.csv")
+
+def load_dataset():
+    df = pd.read_csv(os.path.join(BASE_DIR, "../data/Final.csv"))
 
     # Ensure numeric
     df['AQI'] = pd.to_numeric(df['AQI'], errors='coerce')
 
-    # Categorize AQI into categories
-    def categorize_aqi(aqi):
-        if aqi <= 50:
-            return 'Good'
-        elif aqi <= 100:
-            return 'Moderate'
-        elif aqi <= 150:
-            return 'Unhealthy for Sensitive Groups'
-        elif aqi <= 200:
-            return 'Unhealthy'
-        elif aqi <= 300:
-            return 'Very Unhealthy'
-        else:
-            return 'Hazardous'
-
     df['AQI_Category'] = df['AQI'].apply(categorize_aqi)
+    return df
+
 
-    features = ['Temperature', 'RelativeHumidity']
-    X = df[features]
-    y = df['AQI_Category']
+def train_classifier(df=None):
+    """Fit the scaler and Random Forest once and bundle them as an artifact."""
+    if df is None:
+        df = load_dataset()
+
+    X = df[FEATURES].to_numpy(dtype=float)
+    y = df['AQI_Category'].to_numpy()
 
     #Split dataset for traing 80% and test 20%.
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
@@ -60,104 +82,172 @@ async def run_classifier():
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
 
-    models = {
-        #"Logistic Regression": LogisticRegression(max_iter=1000),
-        #"KNN": KNeighborsClassifier(n_neighbors=5),
-        "Random Forest Tree": RandomForestClassifier( n_estimators=100, max_depth=15, random_state=42)
+    model = RandomForestClassifier(n_estimators=100, max_depth=15, random_state=42, n_jobs=-1)
+    model.fit(X_train_scaled, y_train)
+
+    y_pred = model.predict(X_test_scaled)
+    print(f"\n {MODEL_NAME} Performance:")
+    print(f"Accuracy:  {accuracy_score(y_test, y_pred):.2f}")
+    print(f"Precision: {precision_score(y_test, y_pred, average='weighted'):.2f}")
+    print(f"Recall:    {recall_score(y_test, y_pred, average='weighted'):.2f}")
+    print(f"F1-Score:  {f1_score(y_test, y_pred, average='weighted'):.2f}")
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred, zero_division=0))
+
+    metrics = {
+        "Accuracy": accuracy_score(y_test, y_pred),
+        "Precision": precision_score(y_test, y_pred, average='weighted'),
+        "Recall": recall_score(y_test, y_pred, average='weighted'),
+        "F1-Score": f1_score(y_test, y_pred, average='weighted')
+    }
+
+    artifact = {
+        "version": CLASSIFIER_VERSION,
+        "sklearn_version": sklearn.__version__,
+        "model_name": MODEL_NAME,
+        "features": FEATURES,
+        "scaler": scaler,
+        "model": model,
+        "metrics": metrics,
     }
+    artifact["grid"] = build_lookup_grid(artifact, X)
+
+    # Share of dataset points where grid mode matches the forest
+    exact = _predict_chunked(artifact, X)
+    artifact["grid_agreement"] = float(np.mean(
+        classify(artifact, X[:, 0], X[:, 1], mode="grid") == exact))
+    print(f"Lookup grid agreement with exact mode: {artifact['grid_agreement']:.3f}")
+
+    return artifact
+
+
+def build_lookup_grid(artifact, X):
+    """Pre-score a Temperature x RelativeHumidity grid spanning the training data."""
+    lo = X.min(axis=0)
+    hi = X.max(axis=0)
+    step = np.asarray(GRID_STEP, dtype=float)
+    shape = (np.ceil((hi - lo) / step).astype(int) + 1)
+
+    temps = lo[0] + step[0] * np.arange(shape[0])
+    hums = lo[1] + step[1] * np.arange(shape[1])
+    tt, hh = np.meshgrid(temps, hums, indexing='ij')
+
+    labels = _predict_chunked(artifact, np.c_[tt.ravel(), hh.ravel()])
+    classes = artifact["model"].classes_
+    codes = np.searchsorted(classes, labels).astype(np.uint8)
+
+    return {
+        "origin": lo,
+        "step": step,
+        "codes": codes.reshape(shape),
+        "classes": classes,
+    }
+
+
+def save_classifier(artifact, path=CLASSIFIER_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    joblib.dump(artifact, path)
+
 
-    trained_models = {}
-    for name, model in models.items():
-        model.fit(X_train_scaled, y_train)
-        trained_models[name] = model
-
-    for name, model in trained_models.items():
-        y_pred = model.predict(X_test_scaled)
-        print(f"\n {name} Performance:")
-        print(f"Accuracy:  {accuracy_score(y_test, y_pred):.2f}")
-        print(f"Precision: {precision_score(y_test, y_pred, average='weighted'):.2f}")
-        print(f"Recall:    {recall_score(y_test, y_pred, average='weighted'):.2f}")
-        print(f"F1-Score:  {f1_score(y_test, y_pred, average='weighted'):.2f}")
-        print("\nClassification Report:")
-        print(classification_report(y_test, y_pred, zero_division=0))
-
-        # Confusion Matrix
-        cm = confusion_matrix(y_test, y_pred, labels=np.unique(y_test))
-        plt.figure(figsize=(8, 6))
-        sns.heatmap(cm, annot=True, fmt='d', cmap='YlGnBu',
-                    xticklabels=np.unique(y_test),
-                    yticklabels=np.unique(y_test))
-        plt.title(f"Confusion Matrix - {name}")
-        plt.xlabel("Predicted")
-        plt.ylabel("Actual")
-        plt.xticks(rotation=45)
-        plt.yticks(rotation=45)
-        plt.tight_layout()
-        #plt.show()
-
-
-    feature1 = 'AQI'
-    feature2 ='Temperature'
-
-    # Fit the best model
-    best_model = trained_models['Random Forest Tree']
-    X_vis = df[[feature1, feature2]].dropna()
-    y_vis = df.loc[X_vis.index, 'AQI_Category']
-
-    scaler_vis = StandardScaler()
-    X_vis_scaled = scaler_vis.fit_transform(X_vis)
-
-    # Meshgrid for decision boundary
-    x_min, x_max = X_vis_scaled[:, 0].min() - 1, X_vis_scaled[:, 0].max() + 1
-    y_min, y_max = X_vis_scaled[:, 1].min() - 1, X_vis_scaled[:, 1].max() + 1
-    xx, yy = np.meshgrid(np.arange(x_min, x_max, 0.02),
-                        np.arange(y_min, y_max, 0.02))
-
-    Z = best_model.predict(np.c_[xx.ravel(), yy.ravel()])
-    Z = pd.Categorical(Z).codes.reshape(xx.shape)
-
-    plt.figure(figsize=(10, 8))
-    sns.scatterplot(x=X_vis_scaled[:, 0], y=X_vis_scaled[:, 1], hue=y_vis, palette="viridis", edgecolor="k")
-    plt.contourf(xx, yy, Z, alpha=0.3, cmap='viridis')
-    plt.title("Random Forest AQI Category Classification (AQI vs Temperature)")
-    plt.xlabel(feature1)
-    plt.ylabel(feature2)
-    plt.tight_layout()
-    #plt.show()
+def load_classifier(path=CLASSIFIER_PATH):
+    """Load the persisted artifact, retraining it if missing or out of date."""
+    if os.path.exists(path):
+        artifact = joblib.load(path)
+        if (artifact.get("version") == CLASSIFIER_VERSION
+                and artifact.get("sklearn_version") == sklearn.__version__):
+            return artifact
+        print(f"Classifier artifact at {path} is stale, retraining...")
 
+    artifact = train_classifier()
+    save_classifier(artifact, path)
+    return artifact
+
+
+def _predict_chunked(artifact, X, chunk_size=CLASSIFY_CHUNK_SIZE, token=None):
+    scaler = artifact["scaler"]
+    model = artifact["model"]
+
+    out = np.empty(len(X), dtype=model.classes_.dtype)
+    for i in range(0, len(X), chunk_size):
+        checkpoint(token, f"classify (rows {i}-{min(i + chunk_size, len(X))})")
+        chunk = X[i:i + chunk_size]
+        out[i:i + chunk_size] = model.predict(scaler.transform(chunk))
+    return out
+
+
+def _grid_index(grid, X):
+    return np.rint((X - grid["origin"]) / grid["step"]).astype(np.intp)
+
+
+def grid_out_of_range(artifact, temperature, relative_humidity):
+    """Mask of points outside the lookup grid (clipped to its edge in grid mode)."""
+    grid = artifact["grid"]
+    idx = _grid_index(grid, np.column_stack([
+        np.asarray(temperature, dtype=float),
+        np.asarray(relative_humidity, dtype=float),
+    ]))
+    upper = np.array(grid["codes"].shape) - 1
+    return ((idx < 0) | (idx > upper)).any(axis=1)
+
+
+def classify(artifact, temperature, relative_humidity, mode="exact", token=None):
+    """
+    Classify (Temperature, RelativeHumidity) pairs into AQI categories.
+
+    mode="exact" runs the Random Forest in vectorized chunks; mode="grid"
+    snaps each point to the nearest cell of the pre-scored lookup grid.
+    Points outside the training range are clipped to the grid edge (see
+    grid_out_of_range).
+    """
+    X = np.column_stack([
+        np.asarray(temperature, dtype=float),
+        np.asarray(relative_humidity, dtype=float),
+    ])
+
+    if mode == "exact":
+        return _predict_chunked(artifact, X, token=token)
+
+    if mode == "grid":
+        grid = artifact["grid"]
+        idx = _grid_index(grid, X)
+        np.clip(idx, 0, np.array(grid["codes"].shape) - 1, out=idx)
+        return grid["classes"][grid["codes"][idx[:, 0], idx[:, 1]]]
+
+    raise ValueError(f"Unknown classify mode '{mode}', expected 'exact' or 'grid'")
+
+
+@app.post("/classifier")
+
+def run_classifier(artifact=None, token=None):
+
+    if artifact is None:
+        checkpoint(token, "fit")
+        artifact = load_classifier()
+
+    checkpoint(token, "data load")
+    df = load_dataset()
 
     # Save classification results and model metrics
     all_results = []
     org_data = df.copy()
 
-    for name, model in trained_models.items():
-        org_data[f'Predicted_{name}'] = model.predict(scaler.transform(org_data[features]))
-
-        y_pred = model.predict(X_test_scaled)
-        
-        metrics = {
-            "Accuracy": accuracy_score(y_test, y_pred),
-            "Precision": precision_score(y_test, y_pred, average='weighted'),
-            "Recall": recall_score(y_test, y_pred, average='weighted'),
-            "F1-Score": f1_score(y_test, y_pred, average='weighted')
-        }
-
-        df_output = pd.DataFrame({
-            "Actual": y_test.reset_index(drop=True),
-            "Predicted": y_pred
-        })
-
-        all_results.append({
-            "model": name,
-            "metrics": metrics,
-            "org_data": org_data.replace([np.nan, np.inf, -np.inf], None).to_dict(orient="records")
-        })
+    name = artifact["model_name"]
+    org_data[f'Predicted_{name}'] = classify(
+        artifact, org_data['Temperature'], org_data['RelativeHumidity'], token=token)
+
+    checkpoint(token, "serialize")
+
+    all_results.append({
+        "model": name,
+        "metrics": artifact["metrics"],
+        "org_data": org_data.replace([np.nan, np.inf, -np.inf], None).to_dict(orient="records")
+    })
 
     return {"classifier": all_results}
 
 
 
-    
+
     #results_df.to_csv(output_path, index=False)
     #print(f"Classification results saved to {output_path}")
 
@@ -166,3 +256,9 @@ async def run_classifier():
     #df.to_csv("ML/ML-result/Classification_Data.csv", index=False)
     #print("Classification data with predictions saved")
 
+
+if __name__ == "__main__":
+    # Build (or validate) the classifier artifact ahead of server startup:
+    #   python -m ML.ML_model.ClassificationModels
+    artifact = load_classifier()
+    print(f"Classifier artifact v{artifact['version']} ready at {os.path.abspath(CLASSIFIER_PATH)}")
@@ -0,0 +1,338 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import numpy as np
+from xgboost import XGBRegressor
+
+from ML.ML_model.Cancellation import checkpoint, fit_callbacks
+
+# ---------------------------------------------------------
+# Shared pieces of the AQI forecasters
+# (used by /predict and the backtesting engine)
+# ---------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, "../data/Final.csv")
+
+FEATURES = [
+    'Temperature', 'RelativeHumidity', 'WindSpeed',
+    'month', 'day', 'dayofweek',
+    'aqi_lag_1', 'aqi_lag_3', 'aqi_lag_7', 'aqi_lag_14', 'aqi_lag_30',
+    'aqi_roll_3', 'aqi_roll_7', 'aqi_roll_14',
+    'month_sin', 'month_cos', 'dayofweek_sin', 'dayofweek_cos'
+]
+EXOG = ['Temperature', 'RelativeHumidity', 'WindSpeed']
+LAGS = [1, 3, 7, 14, 30]
+ROLLS = [3, 7, 14]
+
+# Bump whenever features or hyper-parameters change (reported to clients)
+MODEL_VERSION = 1
+
+# Number of past AQI values the forecaster needs to build one feature row
+WINDOW = max(LAGS)
+HORIZON = 180
+
+# Forecast steps run between cancellation checks
+FORECAST_BLOCK = 30
+
+# ---------------------------------------------------------
+# Direct (multi-horizon) forecaster settings
+# ---------------------------------------------------------
+# One model per horizon bucket (inclusive day ranges). Each model sees
+# only what is known at the forecast origin plus the target day's
+# calendar/weather and the horizon itself, so no prediction feeds another.
+DIRECT_BUCKETS = [(1, 7), (8, 30), (31, 90), (91, 180)]
+DIRECT_FEATURES = EXOG + [
+    'month', 'day', 'dayofweek',
+    'month_sin', 'month_cos', 'dayofweek_sin', 'dayofweek_cos',
+    'aqi_lag_1', 'aqi_lag_3', 'aqi_lag_7', 'aqi_lag_14', 'aqi_lag_30',
+    'aqi_roll_3', 'aqi_roll_7', 'aqi_roll_14',
+    'horizon'
+]
+# Training rows drawn per origin for each bucket (random horizons)
+DIRECT_SAMPLES_PER_ORIGIN = 4
+DIRECT_PARAMS = dict(n_estimators=300, max_depth=6)
+
+
+def load_data(path=DATA_PATH):
+    df = pd.read_csv(path)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['AQI'] = pd.to_numeric(df['AQI'], errors='coerce')
+    df['Temperature'] = pd.to_numeric(df['Temperature'], errors='coerce')
+    df['RelativeHumidity'] = pd.to_numeric(
+        df['RelativeHumidity'], errors='coerce')
+    df['WindSpeed'] = pd.to_numeric(df['WindSpeed'], errors='coerce')
+    return df
+
+
+def build_features(region_data):
+    """Add calendar, lag and rolling features to one region's sorted history."""
+    region_data = region_data.copy()
+
+    region_data['month'] = region_data['Date'].dt.month
+    region_data['day'] = region_data['Date'].dt.day
+    region_data['dayofweek'] = region_data['Date'].dt.dayofweek
+
+    for lag in LAGS:
+        region_data[f'aqi_lag_{lag}'] = region_data['AQI'].shift(lag)
+
+    for window in ROLLS:
+        region_data[f'aqi_roll_{window}'] = region_data['AQI'].rolling(window).mean()
+
+    region_data['month_sin'] = np.sin(2 * np.pi * region_data['month'] / 12)
+    region_data['month_cos'] = np.cos(2 * np.pi * region_data['month'] / 12)
+    region_data['dayofweek_sin'] = np.sin(
+        2 * np.pi * region_data['dayofweek'] / 7)
+    region_data['dayofweek_cos'] = np.cos(
+        2 * np.pi * region_data['dayofweek'] / 7)
+
+    region_data = region_data.dropna()
+
+    # 🔥 Ensure lag & rolling features are numeric (Fix for XGBoost dtype error)
+    lag_cols = [f'aqi_lag_{lag}' for lag in LAGS] + [f'aqi_roll_{w}' for w in ROLLS]
+    for col in lag_cols:
+        region_data[col] = pd.to_numeric(region_data[col], errors='coerce')
+
+    return region_data
+
+
+def make_regressor(**overrides):
+    params = dict(
+        n_estimators=600,
+        max_depth=10,
+        learning_rate=0.05,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=42
+    )
+    params.update(overrides)
+    return XGBRegressor(**params)
+
+
+def seed_history(aqi):
+    """Last WINDOW observed AQI values, front-padded with the latest value if short."""
+    aqi = np.asarray(aqi, dtype=float)
+    aqi = aqi[~np.isnan(aqi)][-WINDOW:]
+    if len(aqi) < WINDOW:
+        aqi = np.concatenate([np.full(WINDOW - len(aqi), aqi[-1]), aqi])
+    return aqi
+
+
+def step_features(history, dates, exog):
+    """
+    Build one feature row per forecast in the batch.
+
+    history: (n, >=WINDOW) past AQI values, most recent last
+    dates:   DatetimeIndex of length n (the day being forecast)
+    exog:    (n, 3) Temperature, RelativeHumidity, WindSpeed
+    """
+    month = dates.month.to_numpy()
+    day = dates.day.to_numpy()
+    dayofweek = dates.dayofweek.to_numpy()
+
+    columns = [exog[:, 0], exog[:, 1], exog[:, 2], month, day, dayofweek]
+    columns += [history[:, -lag] for lag in LAGS]
+    columns += [history[:, -window:].mean(axis=1) for window in ROLLS]
+    columns += [
+        np.sin(2 * np.pi * month / 12),
+        np.cos(2 * np.pi * month / 12),
+        np.sin(2 * np.pi * dayofweek / 7),
+        np.cos(2 * np.pi * dayofweek / 7),
+    ]
+    return np.column_stack(columns).astype(float)
+
+
+def iter_recursive_forecast(model, history, start_dates, exog, horizon=HORIZON, token=None, block=FORECAST_BLOCK):
+    """
+    Forecast `horizon` days for a batch of origins at once, yielding
+    (offset, predictions) every `block` days as they are produced.
+
+    Each step feeds the previous prediction back in as the newest lag, so
+    every origin in the batch advances together with a single predict call
+    per step. `exog` is either (n, 3) held constant across the horizon or
+    (n, horizon, 3) with one row per forecast day.
+    """
+    history = np.array(history, dtype=float, ndmin=2)
+    start_dates = pd.DatetimeIndex(start_dates)
+    exog = np.asarray(exog, dtype=float)
+
+    for offset in range(0, horizon, block):
+        checkpoint(token, f"forecast (day {offset + 1})")
+
+        steps = range(offset, min(offset + block, horizon))
+        predictions = np.empty((len(history), len(steps)))
+        for i, step in enumerate(steps):
+            dates = start_dates + pd.Timedelta(days=step)
+            step_exog = exog if exog.ndim == 2 else exog[:, step]
+
+            X = pd.DataFrame(step_features(history, dates, step_exog), columns=FEATURES)
+            pred = model.predict(X)
+
+            predictions[:, i] = pred
+            history = np.column_stack([history[:, 1:], pred])
+
+        yield offset, predictions
+
+
+def recursive_forecast(model, history, start_dates, exog, horizon=HORIZON, token=None):
+    """Run iter_recursive_forecast to completion: an (n, horizon) array."""
+    blocks = iter_recursive_forecast(model, history, start_dates, exog, horizon, token)
+    return np.concatenate([predictions for _, predictions in blocks], axis=1)
+
+
+def origin_features(history):
+    """Lag/rolling features known at the origin: (n, >=WINDOW) -> (n, 8)."""
+    columns = [history[:, -lag] for lag in LAGS]
+    columns += [history[:, -window:].mean(axis=1) for window in ROLLS]
+    return np.column_stack(columns)
+
+
+def calendar_features(dates):
+    month = dates.month.to_numpy()
+    day = dates.day.to_numpy()
+    dayofweek = dates.dayofweek.to_numpy()
+    return np.column_stack([
+        month, day, dayofweek,
+        np.sin(2 * np.pi * month / 12),
+        np.cos(2 * np.pi * month / 12),
+        np.sin(2 * np.pi * dayofweek / 7),
+        np.cos(2 * np.pi * dayofweek / 7),
+    ])
+
+
+def direct_rows(origin_block, dates, exog, horizons):
+    """Assemble DIRECT_FEATURES rows; all arguments are aligned row-wise."""
+    return np.column_stack([
+        exog, calendar_features(dates), origin_block, horizons
+    ]).astype(float)
+
+
+def direct_training_set(region_data, bucket, seed=42):
+    """
+    Sample (origin, horizon) training rows for one bucket.
+
+    The region is first laid out on a daily calendar (rows with missing AQI
+    or weather become gaps), so horizons are calendar days, as at serving
+    time: origin t uses AQI[t - WINDOW:t] as history and horizon h targets
+    day t + h - 1. Origins need a complete WINDOW-day history; samples
+    whose target day falls in a gap are dropped.
+    """
+    daily = (region_data.dropna(subset=['AQI'] + EXOG)
+             .sort_values('Date').set_index('Date').asfreq('D'))
+    aqi = daily['AQI'].to_numpy(dtype=float)
+    weather = daily[EXOG].to_numpy(dtype=float)
+    dates = daily.index
+
+    lo, hi = bucket
+    origins = np.arange(WINDOW, len(aqi) - lo + 1)
+    if len(origins) == 0:
+        return None, None
+
+    windows = np.lib.stride_tricks.sliding_window_view(aqi, WINDOW)
+    origins = origins[~np.isnan(windows[origins - WINDOW]).any(axis=1)]
+
+    rng = np.random.default_rng(seed)
+    origins = np.repeat(origins, DIRECT_SAMPLES_PER_ORIGIN)
+    # Clip so every sampled target stays inside the calendar
+    max_h = np.minimum(hi, len(aqi) - origins)
+    horizons = rng.integers(lo, max_h + 1)
+    targets = origins + horizons - 1
+
+    observed = ~np.isnan(aqi[targets])
+    origins, horizons, targets = origins[observed], horizons[observed], targets[observed]
+    if len(targets) == 0:
+        return None, None
+
+    history = windows[origins - WINDOW]
+    X = direct_rows(origin_features(history), dates[targets], weather[targets], horizons)
+    return X, aqi[targets]
+
+
+def fit_direct_models(region_data, token=None):
+    """Fit one model per horizon bucket, in parallel threads."""
+
+    def fit_bucket(bucket):
+        checkpoint(token, f"direct fit {bucket[0]}-{bucket[1]}")
+        X, y = direct_training_set(region_data, bucket)
+        if X is None:
+            return None
+        # XGBoost releases the GIL, so buckets train concurrently
+        model = make_regressor(n_jobs=1, callbacks=fit_callbacks(token), **DIRECT_PARAMS)
+        model.fit(pd.DataFrame(X, columns=DIRECT_FEATURES), y)
+        return model
+
+    with ThreadPoolExecutor(max_workers=len(DIRECT_BUCKETS)) as pool:
+        models = list(pool.map(fit_bucket, DIRECT_BUCKETS))
+
+    if any(model is None for model in models):
+        raise ValueError("Not enough history to train the direct forecaster")
+    return list(zip(DIRECT_BUCKETS, models))
+
+
+def check_direct_horizon(horizon):
+    """The bucket models only cover days 1 to DIRECT_BUCKETS[-1][1]."""
+    if horizon > DIRECT_BUCKETS[-1][1]:
+        raise ValueError(
+            f"Direct forecaster covers at most {DIRECT_BUCKETS[-1][1]} days, got horizon={horizon}")
+
+
+def _direct_bucket(item, block, start_dates, exog, horizon, token):
+    """Predict every (origin, day) pair covered by one bucket in one call."""
+    (lo, hi), model = item
+    hi = min(hi, horizon)
+    if lo > hi:
+        return None
+    checkpoint(token, f"direct forecast (days {lo}-{hi})")
+
+    n = len(block)
+    horizons = np.tile(np.arange(lo, hi + 1), n)
+    origin = np.repeat(np.arange(n), hi - lo + 1)
+    dates = start_dates[origin] + pd.to_timedelta(horizons - 1, unit='D')
+    if exog.ndim == 2:
+        step_exog = exog[origin]
+    else:
+        step_exog = exog[origin, horizons - 1]
+
+    X = direct_rows(block[origin], dates, step_exog, horizons)
+    pred = model.predict(pd.DataFrame(X, columns=DIRECT_FEATURES))
+    return lo - 1, pred.reshape(n, hi - lo + 1)
+
+
+def iter_direct_forecast(models, history, start_dates, exog, horizon=HORIZON, token=None):
+    """Yield (offset, predictions) one bucket at a time, nearest days first."""
+    check_direct_horizon(horizon)
+    history = np.array(history, dtype=float, ndmin=2)
+    start_dates = pd.DatetimeIndex(start_dates)
+    exog = np.asarray(exog, dtype=float)
+    block = origin_features(history)
+
+    for item in models:
+        result = _direct_bucket(item, block, start_dates, exog, horizon, token)
+        if result is not None:
+            yield result
+
+
+def direct_forecast(models, history, start_dates, exog, horizon=HORIZON, token=None):
+    """
+    Forecast `horizon` days for a batch of origins with the bucket models.
+
+    Each bucket is a single predict call over every (origin, day) pair it
+    covers, and buckets run concurrently. Same arguments and return shape
+    as recursive_forecast.
+    """
+    check_direct_horizon(horizon)
+    history = np.array(history, dtype=float, ndmin=2)
+    start_dates = pd.DatetimeIndex(start_dates)
+    exog = np.asarray(exog, dtype=float)
+    block = origin_features(history)
+
+    predictions = np.empty((len(history), horizon))
+    with ThreadPoolExecutor(max_workers=len(models)) as pool:
+        results = pool.map(
+            lambda item: _direct_bucket(item, block, start_dates, exog, horizon, token),
+            models)
+        for result in results:
+            if result is not None:
+                offset, values = result
+                predictions[:, offset:offset + values.shape[1]] = values
+
+    return predictions
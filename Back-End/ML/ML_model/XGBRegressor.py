@@ -11,13 +11,16 @@ from datetime import timedelta
 from fastapi import FastAPI
 from pydantic import BaseModel
 
+from ML.ML_model.Cancellation import checkpoint, fit_callbacks
+
 app = FastAPI()
 
 @app.post("/regressor")
 
-def run_regressor():
+def run_regressor(token=None):
 
     #Read Data
+    checkpoint(token, "data load")
     df = pd.read_csv("ML/data/Final.csv")          
     #print(df.head(10))
 
@@ -50,6 +53,7 @@ def run_regressor():
         print(f"Processing Country: {country}")
         print("=" * 60)
 
+        checkpoint(token, f"{country} features")
         country_data = df[df['Country'] == country].sort_values('Date').copy()
 
         # -------------------------------
@@ -107,9 +111,11 @@ def run_regressor():
             subsample=0.8,
             colsample_bytree=0.8,
             random_state=42,
-            objective='reg:squarederror'
+            objective='reg:squarederror',
+            callbacks=fit_callbacks(token)
         )
 
+        checkpoint(token, f"{country} fit")
         model.fit(X_train, y_train)
 
         # -------------------------------
@@ -132,7 +138,10 @@ def run_regressor():
         future_dates = pd.date_range(start=country_data['Date'].max() + timedelta(days=1), periods=180)
 
         predictions = []
-        for next_date in future_dates:
+        for i, next_date in enumerate(future_dates):
+            if i % 30 == 0:
+                checkpoint(token, f"{country} forecast (day {i + 1})")
+
             # Prepare next input
             next_row = {
                 'Temperature': last_known['Temperature'].mean(),
@@ -1,19 +1,53 @@
-from fastapi import FastAPI
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from typing import List, Literal
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import numpy as np
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import pandas as pd
-from xgboost import XGBRegressor
 
 from ML.ML_model.XGBRegressor import run_regressor as xgb_run_regressor
-from ML.ML_model.ClassificationModels import run_classifier
+from ML.ML_model.ClassificationModels import (
+    run_classifier, load_classifier, classify, grid_out_of_range
+)
+from ML.ML_model.Forecasting import (
+    FEATURES, HORIZON, MODEL_VERSION, load_data, build_features, make_regressor,
+    seed_history, recursive_forecast, iter_recursive_forecast,
+    fit_direct_models, direct_forecast, iter_direct_forecast
+)
+from ML.ML_model.Cancellation import (
+    CancelToken, RequestCancelled, DeadlineExceeded, checkpoint, fit_callbacks
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------
+# Load persisted models once at startup
+# ---------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.classifier = load_classifier()
+    yield
 
 
 # ---------------------------------------------------------
 # Create FastAPI App
 # ---------------------------------------------------------
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,12 +73,80 @@ def clean_json(obj):
     return obj
 
 
+# ---------------------------------------------------------
+# Helper: request deadlines & cooperative cancellation
+# ---------------------------------------------------------
+# Clients may send X-Request-Timeout (seconds); otherwise the default
+# applies. Model code checks the token between stages and gives up once
+# the client disconnects or the deadline passes.
+DEFAULT_REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT_SECONDS", "120"))
+DISCONNECT_POLL_SECONDS = 0.25
+
+# Forecast days per frame on /predict/stream
+STREAM_CHUNK_DAYS = 15
+
+request_stats = Counter()
+request_stats_lock = threading.Lock()
+
+
+def count_request(outcome):
+    with request_stats_lock:
+        request_stats[outcome] += 1
+
+
+def request_timeout(request: Request):
+    """Client deadline from X-Request-Timeout, capped at the server default."""
+    header = request.headers.get("X-Request-Timeout")
+    if header is None:
+        return DEFAULT_REQUEST_TIMEOUT
+    try:
+        timeout = float(header)
+    except ValueError:
+        timeout = 0
+    # NaN compares false with everything, so it would never expire
+    if not (math.isfinite(timeout) and timeout > 0):
+        raise HTTPException(
+            status_code=400,
+            detail="X-Request-Timeout must be a positive number of seconds")
+    return min(timeout, DEFAULT_REQUEST_TIMEOUT)
+
+
+async def watch_disconnect(request: Request, token: CancelToken):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+    token.cancel()
+
+
+async def run_cancellable(request: Request, func, *args, **kwargs):
+    token = CancelToken(request_timeout(request))
+    watcher = asyncio.create_task(watch_disconnect(request, token))
+
+    count_request("started")
+    try:
+        result = await run_in_threadpool(func, *args, token=token, **kwargs)
+    except DeadlineExceeded as e:
+        count_request("expired")
+        raise HTTPException(status_code=504, detail=str(e))
+    except RequestCancelled as e:
+        count_request("cancelled")
+        # 499: client closed request (nobody is left to read it)
+        raise HTTPException(status_code=499, detail=str(e))
+    except Exception:
+        count_request("failed")
+        raise
+    finally:
+        watcher.cancel()
+
+    count_request("completed")
+    return result
+
+
 # ---------------------------------------------------------
 # 1. REGRESSOR ENDPOINT
 # ---------------------------------------------------------
 @app.post("/regressor")
-def regressor_api():
-    result = xgb_run_regressor()
+async def regressor_api(request: Request):
+    result = await run_cancellable(request, xgb_run_regressor)
     if isinstance(result, dict) and "regressor" in result:
         data = result["regressor"]
     else:
@@ -56,8 +158,8 @@ def regressor_api():
 # 2. CLASSIFIER ENDPOINT
 # ---------------------------------------------------------
 @app.post("/classifier")
-async def classifier_api():
-    result = await run_classifier()
+async def classifier_api(request: Request):
+    result = await run_cancellable(request, run_classifier, app.state.classifier)
     if isinstance(result, dict) and "classifier" in result:
         data = result["classifier"]
     else:
@@ -65,17 +167,72 @@ async def classifier_api():
     return {"classifier": clean_json(data)}
 
 
+# ---------------------------------------------------------
+# 3. BULK CLASSIFY ENDPOINT
+# ---------------------------------------------------------
+class ClassifyRequest(BaseModel):
+    temperature: List[float]
+    relative_humidity: List[float]
+    mode: Literal["exact", "grid"] = "exact"
+
+
+@app.post("/classify")
+async def classify_api(payload: ClassifyRequest, request: Request):
+    if len(payload.temperature) != len(payload.relative_humidity):
+        raise HTTPException(
+            status_code=422,
+            detail="temperature and relative_humidity must have the same length")
+
+    # NaN/inf would only get a guess (the forest treats them as missing,
+    # the grid snaps them to a corner), so reject them
+    finite = np.isfinite(payload.temperature) & np.isfinite(payload.relative_humidity)
+    if not finite.all():
+        raise HTTPException(
+            status_code=422,
+            detail=f"temperature and relative_humidity must be finite numbers "
+                   f"(invalid at indices {np.flatnonzero(~finite).tolist()})")
+
+    artifact = app.state.classifier
+    categories = await run_cancellable(
+        request,
+        classify,
+        artifact,
+        payload.temperature,
+        payload.relative_humidity,
+        mode=payload.mode
+    )
+
+    response = {
+        "categories": categories.tolist(),
+        "mode": payload.mode,
+        "model_version": artifact["version"]
+    }
+
+    if payload.mode == "grid":
+        # Indices of inputs outside the training range, answered from the grid edge
+        clipped = grid_out_of_range(
+            artifact, payload.temperature, payload.relative_humidity)
+        response["clipped"] = np.flatnonzero(clipped).tolist()
+        response["grid_agreement"] = artifact["grid_agreement"]
+
+    return response
+
+
 # ---------------------------------------------------------
 # REAL-TIME PREDICTION ENGINE
 # ---------------------------------------------------------
-def run_temp_prediction(country: str, region: str, user_temp: float, user_humidity: float, user_wind: float, start_date: str):
-    df = pd.read_csv("ML/data/Final.csv")
-    df['Date'] = pd.to_datetime(df['Date'])
-    df['AQI'] = pd.to_numeric(df['AQI'], errors='coerce')
-    df['Temperature'] = pd.to_numeric(df['Temperature'], errors='coerce')
-    df['RelativeHumidity'] = pd.to_numeric(
-        df['RelativeHumidity'], errors='coerce')
-    df['WindSpeed'] = pd.to_numeric(df['WindSpeed'], errors='coerce')
+# Models only depend on the region's history and the forecasting mode
+# (user inputs are applied at forecast time), so fitted forecasters are
+# kept in a small LRU cache keyed by (country, region, mode).
+FORECASTER_CACHE_SIZE = int(os.environ.get("FORECASTER_CACHE_SIZE", "64"))
+
+forecaster_cache = OrderedDict()
+forecaster_cache_lock = threading.Lock()
+
+
+def load_region(country: str, region: str, token=None):
+    checkpoint(token, "data load")
+    df = load_data()
 
     # Filter by both country AND region
     country_data = df[(df['Country'] == country) & (
@@ -86,118 +243,113 @@ def run_temp_prediction(country: str, region: str, user_temp: float, user_humidi
         raise ValueError(
             f"No data found for country '{country}' and region '{region}'")
 
-    # Feature engineering
-    country_data['month'] = country_data['Date'].dt.month
-    country_data['day'] = country_data['Date'].dt.day
-    country_data['dayofweek'] = country_data['Date'].dt.dayofweek
+    return country_data
 
-    for lag in [1, 3, 7, 14, 30]:
-        country_data[f'aqi_lag_{lag}'] = country_data['AQI'].shift(lag)
 
-    country_data['aqi_roll_3'] = country_data['AQI'].rolling(3).mean()
-    country_data['aqi_roll_7'] = country_data['AQI'].rolling(7).mean()
-    country_data['aqi_roll_14'] = country_data['AQI'].rolling(14).mean()
+def fit_forecaster(country_data, mode: str, token=None):
+    # Take last 30 rows (padded if the region has less history)
+    history = seed_history(country_data['AQI'])
 
-    country_data['month_sin'] = np.sin(2 * np.pi * country_data['month'] / 12)
-    country_data['month_cos'] = np.cos(2 * np.pi * country_data['month'] / 12)
-    country_data['dayofweek_sin'] = np.sin(
-        2 * np.pi * country_data['dayofweek'] / 7)
-    country_data['dayofweek_cos'] = np.cos(
-        2 * np.pi * country_data['dayofweek'] / 7)
+    if mode == "direct":
+        # One model per horizon bucket, each predicted in a single call
+        model = fit_direct_models(country_data, token=token)
+    else:
+        # Feature engineering
+        checkpoint(token, "features")
+        country_data = build_features(country_data)
 
-    country_data = country_data.dropna()
+        # Train model (demo)
+        X = country_data[FEATURES]
+        y = country_data['AQI']
 
-    # 🔥 Ensure lag & rolling features are numeric (Fix for XGBoost dtype error)
-    lag_cols = [
-        'aqi_lag_1', 'aqi_lag_3', 'aqi_lag_7', 'aqi_lag_14', 'aqi_lag_30',
-        'aqi_roll_3', 'aqi_roll_7', 'aqi_roll_14'
-    ]
+        checkpoint(token, "fit")
+        model = make_regressor(callbacks=fit_callbacks(token))
+        model.fit(X, y)
+
+    return {"mode": mode, "model": model, "history": history}
 
-    for col in lag_cols:
-        country_data[col] = pd.to_numeric(country_data[col], errors='coerce')
 
-    # Train model (demo)
-    features = [
-        'Temperature', 'RelativeHumidity', 'WindSpeed',
-        'month', 'day', 'dayofweek',
-        'aqi_lag_1', 'aqi_lag_3', 'aqi_lag_7', 'aqi_lag_14', 'aqi_lag_30',
-        'aqi_roll_3', 'aqi_roll_7', 'aqi_roll_14',
-        'month_sin', 'month_cos', 'dayofweek_sin', 'dayofweek_cos'
+def cached_forecaster(key):
+    with forecaster_cache_lock:
+        forecaster = forecaster_cache.get(key)
+        if forecaster is not None:
+            forecaster_cache.move_to_end(key)
+        return forecaster
+
+
+def store_forecaster(key, forecaster):
+    with forecaster_cache_lock:
+        forecaster_cache[key] = forecaster
+        forecaster_cache.move_to_end(key)
+        while len(forecaster_cache) > FORECASTER_CACHE_SIZE:
+            forecaster_cache.popitem(last=False)
+
+
+def get_forecaster(country: str, region: str, mode: str, token=None):
+    """Return (forecaster, cache_status), fitting and caching on a miss."""
+    key = (country, region, mode)
+    forecaster = cached_forecaster(key)
+    if forecaster is not None:
+        return forecaster, "hit"
+
+    forecaster = fit_forecaster(load_region(country, region, token), mode, token)
+    store_forecaster(key, forecaster)
+    return forecaster, "miss"
+
+
+def iter_forecast(forecaster, start, user_exog, token=None, block=STREAM_CHUNK_DAYS):
+    """Yield (offset, aqi values) chunks of the forecast as they are produced."""
+    model, history = forecaster["model"], forecaster["history"]
+    if forecaster["mode"] == "direct":
+        blocks = iter_direct_forecast(model, history, [start], user_exog, HORIZON, token)
+    else:
+        blocks = iter_recursive_forecast(model, history, [start], user_exog, HORIZON, token, block)
+
+    for offset, predictions in blocks:
+        yield offset, predictions[0]
+
+
+def prediction_points(start, offset, values):
+    dates = pd.date_range(start=start + pd.Timedelta(days=offset), periods=len(values))
+    return [
+        {"date": d.strftime("%Y-%m-%d"), "aqi": float(p)}
+        for d, p in zip(dates, values)
     ]
 
-    X = country_data[features]
-    y = country_data['AQI']
 
-    model = XGBRegressor(
-        n_estimators=600,
-        max_depth=10,
-        learning_rate=0.05,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        random_state=42
-    )
-    model.fit(X, y)
+def parse_start_date(start_date: str):
+    # Checked before any model work so a bad date fails fast with a 422
+    try:
+        start = pd.to_datetime(start_date)
+    except (ValueError, OverflowError):
+        start = pd.NaT
+    if pd.isna(start):
+        raise HTTPException(
+            status_code=422, detail=f"Invalid date '{start_date}', expected YYYY-MM-DD")
+    return start
+
+
+def run_temp_prediction(country: str, region: str, user_temp: float, user_humidity: float, user_wind: float, start_date: str, mode: str = "recursive", token=None):
+    start = parse_start_date(start_date)
+    forecaster, _ = get_forecaster(country, region, mode, token)
 
     # ---- Start Simulation ----
-    start = pd.to_datetime(start_date)
-    future_dates = pd.date_range(start=start, periods=180)
-
-    # Take last 30 rows
-    last_known = country_data.iloc[-30:].copy()
-
-    # ---------------------------------------------------------
-    # ✅ FIX: ensure we have at least 30 rows to avoid index errors
-    # ---------------------------------------------------------
-    if len(last_known) < 30:
-        last_value = last_known['AQI'].iloc[-1]
-        missing = 30 - len(last_known)
-        padding = pd.DataFrame({
-            'Date': [last_known['Date'].iloc[-1]] * missing,
-            'AQI': [last_value] * missing
-        })
-        last_known = pd.concat([padding, last_known]).reset_index(drop=True)
-    # ---------------------------------------------------------
-
-    predictions = []
-
-    for next_date in future_dates:
-
-        next_row = {
-            'Temperature': user_temp,
-            'RelativeHumidity': user_humidity,
-            'WindSpeed': user_wind,
-            'month': next_date.month,
-            'day': next_date.day,
-            'dayofweek': next_date.dayofweek,
-            'aqi_lag_1': last_known['AQI'].iloc[-1],
-            'aqi_lag_3': last_known['AQI'].iloc[-3],
-            'aqi_lag_7': last_known['AQI'].iloc[-7],
-            'aqi_lag_14': last_known['AQI'].iloc[-14],
-            'aqi_lag_30': last_known['AQI'].iloc[-30],
-            'aqi_roll_3': last_known['AQI'].iloc[-3:].mean(),
-            'aqi_roll_7': last_known['AQI'].iloc[-7:].mean(),
-            'aqi_roll_14': last_known['AQI'].iloc[-14:].mean(),
-            'month_sin': np.sin(2 * np.pi * next_date.month / 12),
-            'month_cos': np.cos(2 * np.pi * next_date.month / 12),
-            'dayofweek_sin': np.sin(2 * np.pi * next_date.dayofweek / 7),
-            'dayofweek_cos': np.cos(2 * np.pi * next_date.dayofweek / 7)
-        }
-
-        pred = model.predict(pd.DataFrame([next_row]))[0]
-
-        predictions.append({
-            "date": next_date.strftime("%Y-%m-%d"),
-            "aqi": float(pred)
-        })
-
-        new_row = pd.DataFrame({'Date': [next_date], 'AQI': [pred]})
-        last_known = pd.concat([last_known, new_row]
-                               ).iloc[1:].reset_index(drop=True)
+    future_dates = pd.date_range(start=start, periods=HORIZON)
+    user_exog = [[user_temp, user_humidity, user_wind]]
+
+    model, history = forecaster["model"], forecaster["history"]
+    if mode == "direct":
+        forecast = direct_forecast(
+            model, history, [start], user_exog, horizon=HORIZON, token=token)[0]
+    else:
+        forecast = recursive_forecast(
+            model, history, [start], user_exog, horizon=HORIZON, token=token)[0]
 
     return {
-        "predictions": predictions,
+        "predictions": prediction_points(start, 0, forecast),
         "start_date": start.strftime("%Y-%m-%d"),
-        "end_date": future_dates[-1].strftime("%Y-%m-%d")
+        "end_date": future_dates[-1].strftime("%Y-%m-%d"),
+        "mode": mode
     }
 
 
@@ -211,13 +363,14 @@ class PredictionRequest(BaseModel):
     relative_humidity: float
     wind_speed: float
     date: str
+    mode: Literal["recursive", "direct"] = "recursive"
 
 
 # ---------------------------
 # /predict API
 # ---------------------------
 @app.post("/predict")
-def predict_api(payload: PredictionRequest):
+async def predict_api(payload: PredictionRequest, request: Request):
 
     country = payload.country
     region = payload.region
@@ -226,13 +379,145 @@ def predict_api(payload: PredictionRequest):
     wind = payload.wind_speed
     start_date = payload.date
 
-    predictions = run_temp_prediction(
+    predictions = await run_cancellable(
+        request,
+        run_temp_prediction,
         country=country,
         region=region,
         user_temp=temp,
         user_humidity=humidity,
         user_wind=wind,
-        start_date=start_date
+        start_date=start_date,
+        mode=payload.mode
     )
 
     return clean_json(predictions)
+
+
+# ---------------------------
+# /predict/stream API
+# ---------------------------
+# Sends the forecast as NDJSON (or server-sent events when the client
+# accepts text/event-stream): a "meta" frame straight away, "points"
+# frames as each chunk of days is forecast, then "done" (or "error").
+def stream_frame(frame, sse: bool):
+    data = json.dumps(clean_json(frame))
+    if sse:
+        return f"event: {frame['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+@app.post("/predict/stream")
+async def predict_stream_api(payload: PredictionRequest, request: Request):
+    token = CancelToken(request_timeout(request))
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    count_request("started")
+    try:
+        start = parse_start_date(payload.date)
+    except HTTPException:
+        count_request("failed")
+        raise
+
+    user_exog = [[payload.temperature, payload.relative_humidity, payload.wind_speed]]
+    key = (payload.country, payload.region, payload.mode)
+
+    # On a miss, validate the region before committing to a 200 stream;
+    # the (slow) fit itself happens after the meta frame is sent.
+    forecaster = cached_forecaster(key)
+    cache_status = "hit" if forecaster is not None else "miss"
+    country_data = None
+    if forecaster is None:
+        try:
+            country_data = await run_in_threadpool(
+                load_region, payload.country, payload.region, token)
+        except DeadlineExceeded as e:
+            count_request("expired")
+            raise HTTPException(status_code=504, detail=str(e))
+        except RequestCancelled as e:
+            count_request("cancelled")
+            raise HTTPException(status_code=499, detail=str(e))
+        except ValueError as e:
+            count_request("failed")
+            raise HTTPException(status_code=422, detail=str(e))
+
+    def frames():
+        nonlocal forecaster
+        started = time.perf_counter()
+        first_point_ms = None
+
+        yield stream_frame({
+            "type": "meta",
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": (start + pd.Timedelta(days=HORIZON - 1)).strftime("%Y-%m-%d"),
+            "days": HORIZON,
+            "mode": payload.mode,
+            "model_version": MODEL_VERSION,
+            "cache": cache_status
+        }, sse)
+
+        if forecaster is None:
+            forecaster = fit_forecaster(country_data, payload.mode, token)
+            store_forecaster(key, forecaster)
+
+        for offset, values in iter_forecast(forecaster, start, user_exog, token):
+            if first_point_ms is None:
+                first_point_ms = (time.perf_counter() - started) * 1000
+            yield stream_frame({
+                "type": "points",
+                "offset": offset,
+                "predictions": prediction_points(start, offset, values)
+            }, sse)
+
+        yield stream_frame({
+            "type": "done",
+            "first_point_ms": round(first_point_ms, 1),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1)
+        }, sse)
+
+    async def body():
+        watcher = asyncio.create_task(watch_disconnect(request, token))
+        outcome = "cancelled"
+        try:
+            async for chunk in iterate_in_threadpool(frames()):
+                yield chunk
+            outcome = "completed"
+        except DeadlineExceeded as e:
+            outcome = "expired"
+            yield stream_frame({"type": "error", "detail": str(e)}, sse)
+        except RequestCancelled:
+            pass
+        except Exception:
+            outcome = "failed"
+            # Headers are already sent, so log it here; the client only
+            # gets a generic message (no internal error text)
+            logger.exception("Prediction stream failed for %s", key)
+            yield stream_frame({"type": "error", "detail": "Prediction failed"}, sse)
+        finally:
+            watcher.cancel()
+            # Stops the worker at its next checkpoint if we were torn down
+            token.cancel()
+            count_request(outcome)
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type)
+
+
+# ---------------------------
+# /stats API
+# ---------------------------
+@app.get("/stats")
+def stats_api():
+    with request_stats_lock:
+        counts = dict(request_stats)
+
+    return {
+        "requests": {
+            "started": counts.get("started", 0),
+            "completed": counts.get("completed", 0),
+            "cancelled": counts.get("cancelled", 0),
+            "expired": counts.get("expired", 0),
+            "failed": counts.get("failed", 0),
+        },
+        "default_timeout_seconds": DEFAULT_REQUEST_TIMEOUT
+    }
@@ -16,6 +16,36 @@ app.use(express.json());
 const WAQI_TOKEN = process.env.WAQI_TOKEN || '4270e59f10d0948e38cd570a70a231ef544629e5';
 const WAQI_BASE_URL = 'https://api.waqi.info';
 
+// FastAPI request deadline (ms). Clients may override it per request with
+// an X-Request-Timeout header in seconds.
+const FASTAPI_TIMEOUT_MS = Number(process.env.FASTAPI_TIMEOUT_MS) || 120000;
+
+// Build axios options for a FastAPI call: forward the deadline and abort
+// the upstream request if the client disconnects, so FastAPI stops work.
+function fastapiOptions(req, res) {
+  const controller = new AbortController();
+  res.on('close', () => {
+    if (!res.writableFinished) controller.abort();
+  });
+
+  const clientTimeout = Number(req.get('X-Request-Timeout'));
+  const timeoutSeconds = Number.isFinite(clientTimeout) && clientTimeout > 0
+    ? Math.min(clientTimeout, FASTAPI_TIMEOUT_MS / 1000)
+    : FASTAPI_TIMEOUT_MS / 1000;
+
+  return {
+    signal: controller.signal,
+    // small grace period so FastAPI's own 504 arrives before axios gives up
+    timeout: timeoutSeconds * 1000 + 1000,
+    headers: { 'X-Request-Timeout': String(timeoutSeconds) },
+  };
+}
+
+// True when FastAPI (or axios) gave up because the deadline passed
+function isDeadlineError(err) {
+  return err.response?.status === 504 || err.code === 'ECONNABORTED';
+}
+
 // Helper function to transform WAQI response to our AQIData format
 function transformWAQIData(data) {
   // Extract city and country from name (format: "City (Country)" or "City, Country")
@@ -46,7 +76,7 @@ function transformWAQIData(data) {
 // Classification Result
 app.get("/api/classification", async (req, res) => {
   try {
-    const response = await axios.post('http://localhost:8000/classifier', {});
+    const response = await axios.post('http://localhost:8000/classifier', {}, fastapiOptions(req, res));
 
     console.log(response.data);
 
@@ -55,8 +85,10 @@ app.get("/api/classification", async (req, res) => {
     res.json({ classifier });
 
   } catch (err) {
+    if (axios.isCancel(err)) return; // client went away
+
     console.error("Error fetching classification result:", err.response?.data || err.message);
-    res.status(500).json({
+    res.status(isDeadlineError(err) ? 504 : 500).json({
       message: "Error fetching classification result from FastAPI",
       error: err.response?.data || err.message
     });
@@ -66,7 +98,7 @@ app.get("/api/classification", async (req, res) => {
 // Regression Result
 app.get("/api/regression", async (req, res) => {
   try {
-    const response = await axios.post('http://localhost:8000/regressor', {});
+    const response = await axios.post('http://localhost:8000/regressor', {}, fastapiOptions(req, res));
 
     console.log(response.data);
 
@@ -75,8 +107,10 @@ app.get("/api/regression", async (req, res) => {
     res.json({ regressor });
 
   } catch (err) {
+    if (axios.isCancel(err)) return; // client went away
+
     console.error("Error fetching regression result:", err.response?.data || err.message);
-    res.status(500).json({
+    res.status(isDeadlineError(err) ? 504 : 500).json({
       message: "Error fetching regression result from FastAPI",
       error: err.response?.data || err.message
     });
@@ -108,14 +142,9 @@ app.get("/api/data", async (req, res) => {
 });
 
 // ----------------------------------------
-// Real-time prediction endpoint (VALIDATION ADDED HERE)
+// Prediction input validation (shared by /api/predict and /api/predict/stream)
 // ----------------------------------------
-app.post("/api/predict", async (req, res) => {
-  const payload = req.body;
-
-  // -------------------------
-  // INPUT VALIDATION
-  // -------------------------
+function validatePredictPayload(payload) {
   const errors = [];
 
   if (!payload.country) errors.push("country is required");
@@ -142,6 +171,9 @@ app.post("/api/predict", async (req, res) => {
   if (payload.wind_speed < 0 || payload.wind_speed > 200)
     errors.push("wind_speed is unrealistic (0–200)");
 
+  if (payload.mode != null && !["recursive", "direct"].includes(payload.mode))
+    errors.push("mode must be 'recursive' or 'direct'");
+
   // -------------------------
   // REGION VALIDATION - Verify region exists for the country
   // -------------------------
@@ -166,6 +198,33 @@ app.post("/api/predict", async (req, res) => {
     }
   }
 
+  return errors;
+}
+
+// Forward the correct payload structure to Python backend
+function toPythonPayload(payload) {
+  return {
+    country: payload.country,
+    region: payload.region,
+    temperature: payload.temperature,
+    relative_humidity: payload.relative_humidity,
+    wind_speed: payload.wind_speed,
+    date: payload.date,
+    mode: payload.mode || "recursive"
+  };
+}
+
+// ----------------------------------------
+// Real-time prediction endpoint (VALIDATION ADDED HERE)
+// ----------------------------------------
+app.post("/api/predict", async (req, res) => {
+  const payload = req.body;
+
+  // -------------------------
+  // INPUT VALIDATION
+  // -------------------------
+  const errors = validatePredictPayload(payload);
+
   if (errors.length > 0) {
     return res.status(400).json({
       error: "Invalid input",
@@ -178,23 +237,17 @@ app.post("/api/predict", async (req, res) => {
   // -------------------------
 
   try {
-    // Forward the correct payload structure to Python backend
-    const pythonPayload = {
-      country: payload.country,
-      region: payload.region,
-      temperature: payload.temperature,
-      relative_humidity: payload.relative_humidity,
-      wind_speed: payload.wind_speed,
-      date: payload.date
-    };
+    const pythonPayload = toPythonPayload(payload);
 
-    const response = await axios.post("http://localhost:8000/predict", pythonPayload);
+    const response = await axios.post("http://localhost:8000/predict", pythonPayload, fastapiOptions(req, res));
 
     console.log("Predict result:", response.data);
 
     res.json(response.data);
 
   } catch (err) {
+    if (axios.isCancel(err)) return; // client went away
+
     console.error("Error fetching prediction:", err.response?.data || err.message);
 
     // Handle validation errors from Python backend
@@ -205,6 +258,13 @@ app.post("/api/predict", async (req, res) => {
       });
     }
 
+    if (isDeadlineError(err)) {
+      return res.status(504).json({
+        error: "Prediction timed out",
+        details: err.response?.data || err.message
+      });
+    }
+
     res.status(500).json({
       error: "Prediction failed",
       details: err.response?.data || err.message
@@ -212,6 +272,68 @@ app.post("/api/predict", async (req, res) => {
   }
 });
 
+// ----------------------------------------
+// Streaming prediction endpoint
+// Pipes FastAPI's NDJSON / server-sent event frames straight through,
+// so forecast days reach the browser as soon as they are computed.
+// ----------------------------------------
+// With responseType "stream" an error response body is a stream as well
+async function readStreamDetail(err) {
+  const stream = err.response?.data;
+  if (!stream || typeof stream.on !== "function") return err.message;
+
+  let body = "";
+  try {
+    for await (const chunk of stream) body += chunk;
+    return JSON.parse(body).detail || err.message;
+  } catch {
+    return body || err.message;
+  }
+}
+
+app.post("/api/predict/stream", async (req, res) => {
+  const errors = validatePredictPayload(req.body);
+
+  if (errors.length > 0) {
+    return res.status(400).json({
+      error: "Invalid input",
+      details: errors,
+    });
+  }
+
+  try {
+    const options = fastapiOptions(req, res);
+    const response = await axios.post(
+      "http://localhost:8000/predict/stream",
+      toPythonPayload(req.body),
+      {
+        ...options,
+        responseType: "stream",
+        headers: { ...options.headers, Accept: req.get("Accept") || "application/x-ndjson" },
+      }
+    );
+
+    res.setHeader("Content-Type", response.headers["content-type"]);
+    res.setHeader("Cache-Control", "no-cache");
+
+    // The upstream stream errors when we abort it on client disconnect
+    response.data.on("error", () => res.end());
+    response.data.pipe(res);
+
+  } catch (err) {
+    if (axios.isCancel(err)) return; // client went away
+
+    const details = await readStreamDetail(err);
+    console.error("Error streaming prediction:", details);
+
+    const status = err.response?.status;
+    res.status(status === 422 ? 400 : isDeadlineError(err) ? 504 : 500).json({
+      error: status === 422 ? "Validation error" : "Prediction failed",
+      details
+    });
+  }
+});
+
 // ----------------------------------------
 // Regions endpoint
 // ----------------------------------------
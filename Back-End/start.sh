@@ -82,6 +82,16 @@ cleanup() {
 # Trap Ctrl+C and call cleanup
 trap cleanup SIGINT SIGTERM
 
+# Train the classifier artifact up front (no-op if it is already current),
+# so the FastAPI server only has to load it at startup
+echo -e "${YELLOW}🌲 Preparing classifier artifact...${NC}"
+python3 -m ML.ML_model.ClassificationModels
+
+if [ $? -ne 0 ]; then
+    echo -e "${RED}❌ Failed to prepare classifier artifact${NC}"
+    exit 1
+fi
+
 # Start Python FastAPI server
 echo -e "${GREEN}🐍 Starting Python FastAPI server on port 8000...${NC}"
 python3 -m uvicorn main:app --host 0.0.0.0 --port 8000 --reload > /tmp/python_server.log 2>&1 &
@@ -89,7 +99,7 @@ PYTHON_PID=$!
 
 # Wait for Python server to start and check if it's actually running
 echo -e "${YELLOW}⏳ Waiting for Python server to start...${NC}"
-MAX_WAIT=10
+MAX_WAIT=30
 WAITED=0
 while [ $WAITED -lt $MAX_WAIT ]; do
     if curl -s http://localhost:8000/docs > /dev/null 2>&1; then
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the back-end the way uvicorn does, from the Back-End directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
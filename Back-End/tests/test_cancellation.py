@@ -0,0 +1,113 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from ML.ML_model.Cancellation import (
+    CancelToken, RequestCancelled, DeadlineExceeded, checkpoint, fit_callbacks
+)
+from ML.ML_model.Forecasting import make_regressor
+
+PREDICT_BODY = dict(
+    country="Malaysia", region="AlorSetar", temperature=28.5,
+    relative_humidity=75.0, wind_speed=15.0, date="2025-01-01"
+)
+
+# Not entered as a context manager, so the classifier is not loaded at startup
+client = TestClient(main.app)
+
+
+def expired_token():
+    token = CancelToken(timeout=60)
+    token.deadline = time.monotonic() - 1
+    return token
+
+
+def stats():
+    return client.get("/stats").json()["requests"]
+
+
+# ---------------------------
+# CancelToken / checkpoint
+# ---------------------------
+def test_expired_token_raises_deadline_at_first_checkpoint():
+    with pytest.raises(DeadlineExceeded, match="data load"):
+        checkpoint(expired_token(), "data load")
+
+
+def test_cancelled_token_raises_request_cancelled():
+    token = CancelToken(timeout=60)
+    token.cancel()
+    with pytest.raises(RequestCancelled) as excinfo:
+        checkpoint(token, "fit")
+    assert not isinstance(excinfo.value, DeadlineExceeded)
+    assert token.stage == "fit"
+
+
+def test_checkpoint_passes_without_token_or_deadline():
+    checkpoint(None, "fit")
+    CancelToken().check("fit")
+    CancelToken(timeout=60).check("fit")
+
+
+def test_cancel_callback_stops_fit():
+    token = CancelToken(timeout=60)
+    token.cancel()
+    model = make_regressor(n_estimators=50, callbacks=fit_callbacks(token))
+    with pytest.raises(RequestCancelled, match="round 0"):
+        model.fit([[0.0], [1.0], [2.0]], [0.0, 1.0, 2.0])
+
+
+# ---------------------------
+# run_cancellable status mapping and /stats
+# ---------------------------
+def test_predict_deadline_returns_504_and_counts_expired():
+    before = stats()
+    response = client.post("/predict", json=PREDICT_BODY, headers={"X-Request-Timeout": "0.000001"})
+
+    assert response.status_code == 504
+    after = stats()
+    assert after["started"] == before["started"] + 1
+    assert after["expired"] == before["expired"] + 1
+
+
+def test_cancelled_request_returns_499_and_counts_cancelled(monkeypatch):
+    def cancelled_prediction(token=None, **kwargs):
+        token.cancel()
+        checkpoint(token, "forecast")
+
+    monkeypatch.setattr(main, "run_temp_prediction", cancelled_prediction)
+    before = stats()
+    response = client.post("/predict", json=PREDICT_BODY)
+
+    assert response.status_code == 499
+    after = stats()
+    assert after["cancelled"] == before["cancelled"] + 1
+    assert after["expired"] == before["expired"]
+
+
+def test_completed_request_is_counted(monkeypatch):
+    monkeypatch.setattr(main, "run_temp_prediction", lambda token=None, **kwargs: {"predictions": []})
+    before = stats()
+    response = client.post("/predict", json=PREDICT_BODY)
+
+    assert response.status_code == 200
+    assert stats()["completed"] == before["completed"] + 1
+
+
+@pytest.mark.parametrize("header", ["nan", "inf", "-1", "0", "soon"])
+def test_invalid_timeout_header_is_rejected(header):
+    response = client.post("/predict", json=PREDICT_BODY, headers={"X-Request-Timeout": header})
+    assert response.status_code == 400
+
+
+def test_timeout_header_is_capped_at_default(monkeypatch):
+    def remaining(token=None, **kwargs):
+        return {"remaining": token.deadline - time.monotonic()}
+
+    monkeypatch.setattr(main, "run_temp_prediction", remaining)
+    response = client.post("/predict", json=PREDICT_BODY, headers={"X-Request-Timeout": "86400"})
+
+    assert response.status_code == 200
+    assert response.json()["remaining"] <= main.DEFAULT_REQUEST_TIMEOUT
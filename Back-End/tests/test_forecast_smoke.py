@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+from main import run_temp_prediction
+from ML.ML_model.Forecasting import HORIZON, load_data
+
+REGIONS = sorted(load_data().groupby(['Country', 'Region']).groups)
+
+
+@pytest.mark.parametrize("mode", ["recursive", "direct"])
+@pytest.mark.parametrize("country,region", REGIONS)
+def test_predict_every_region(country, region, mode):
+    result = run_temp_prediction(country, region, 28.5, 75.0, 15.0, "2025-01-01", mode=mode)
+
+    aqi = [point["aqi"] for point in result["predictions"]]
+    assert result["mode"] == mode
+    assert len(aqi) == HORIZON
+    assert np.isfinite(aqi).all()
@@ -0,0 +1,73 @@
+import json
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+from ML.ML_model.Forecasting import HORIZON
+
+PREDICT_BODY = dict(
+    country="Malaysia", region="AlorSetar", temperature=28.5,
+    relative_humidity=75.0, wind_speed=15.0, date="2025-01-01"
+)
+
+# Not entered as a context manager, so the classifier is not loaded at startup
+client = TestClient(main.app)
+
+
+def stats():
+    return client.get("/stats").json()["requests"]
+
+
+def test_stream_frame_sequence():
+    response = client.post("/predict/stream", json=PREDICT_BODY)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    frames = [json.loads(line) for line in response.text.splitlines()]
+
+    meta, points, done = frames[0], frames[1:-1], frames[-1]
+    assert meta["type"] == "meta"
+    assert (meta["start_date"], meta["end_date"]) == ("2025-01-01", "2025-06-29")
+    assert done["type"] == "done"
+
+    assert [frame["type"] for frame in points] == ["points"] * (HORIZON // main.STREAM_CHUNK_DAYS)
+    assert [frame["offset"] for frame in points] == list(range(0, HORIZON, main.STREAM_CHUNK_DAYS))
+
+    dates = [p["date"] for frame in points for p in frame["predictions"]]
+    expected = pd.date_range("2025-01-01", periods=HORIZON).strftime("%Y-%m-%d").tolist()
+    assert dates == expected
+
+
+def test_stream_sse_framing():
+    response = client.post("/predict/stream", json=PREDICT_BODY, headers={"Accept": "text/event-stream"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events[0] == "event: meta"
+    assert events[-1] == "event: done"
+
+
+def test_stream_unknown_region_returns_422():
+    before = stats()
+    response = client.post("/predict/stream", json={**PREDICT_BODY, "region": "Atlantis"})
+
+    assert response.status_code == 422
+    assert "Atlantis" in response.json()["detail"]
+    after = stats()
+    assert after["started"] == before["started"] + 1
+    assert after["failed"] == before["failed"] + 1
+
+
+def test_invalid_date_returns_422_before_model_work():
+    for path in ["/predict/stream", "/predict"]:
+        before = stats()
+        response = client.post(path, json={**PREDICT_BODY, "region": "Atlantis", "date": "not-a-date"})
+
+        # Fails on the date, before the unknown region is even looked up
+        assert response.status_code == 422
+        assert "not-a-date" in response.json()["detail"]
+        after = stats()
+        assert after["started"] == before["started"] + 1
+        assert after["failed"] == before["failed"] + 1
@@ -3,7 +3,8 @@ import type {
   DataResponse,
   PredictionRequest,
   PredictionResponse,
-  MultiDayPredictionResponse
+  MultiDayPredictionResponse,
+  PredictionStreamFrame
 } from "../types/aqi.types";
 
 // --------------------------------------------------------
@@ -12,8 +13,16 @@ import type {
 const api = axios.create({
   baseURL: "http://localhost:3001",
   timeout: 15000,
+  // Let the backend abandon model work once we stop waiting for it
+  headers: { "X-Request-Timeout": "15" },
 });
 
+// A streamed forecast may have to train its model first (after the meta
+// frame), which alone can exceed the 15 s used for buffered calls on a busy
+// server. Points keep arriving once it starts, so allow the backend's full
+// default deadline; the backend caps anything longer.
+export const PREDICT_STREAM_TIMEOUT_SECONDS = 120;
+
 // --------------------------------------------------------
 // API wrapper
 // --------------------------------------------------------
@@ -41,6 +50,50 @@ export const aqiApi = {
     );
   },
 
+  // --------------------------------------------------------
+  // Streaming prediction: onFrame runs for every NDJSON frame
+  // as soon as it arrives (axios can't stream in the browser)
+  // --------------------------------------------------------
+  predictStream: async (
+    data: PredictionRequest,
+    onFrame: (frame: PredictionStreamFrame) => void,
+    signal?: AbortSignal,
+    timeoutSeconds: number = PREDICT_STREAM_TIMEOUT_SECONDS
+  ) => {
+    const response = await fetch(`${api.defaults.baseURL}/api/predict/stream`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        Accept: "application/x-ndjson",
+        "X-Request-Timeout": String(timeoutSeconds),
+      },
+      body: JSON.stringify(data),
+      signal,
+    });
+
+    if (!response.ok || !response.body) {
+      const body = await response.json().catch(() => ({}));
+      const details = Array.isArray(body.details) ? body.details.join(", ") : body.details;
+      throw new Error(details || body.error || `Prediction failed (${response.status})`);
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = "";
+
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+
+      buffer += value;
+      const lines = buffer.split("\n");
+      buffer = lines.pop() ?? "";
+
+      for (const line of lines) {
+        if (line.trim()) onFrame(JSON.parse(line));
+      }
+    }
+  },
+
   // Health check
   health: async () => {
     return api.get("/health");
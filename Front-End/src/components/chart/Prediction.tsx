@@ -9,12 +9,15 @@ type PredictionPoint = {
 
 interface PredictionChartProps {
   data: PredictionPoint[];
+  // Full forecast date range, so a partially streamed forecast keeps its x axis
+  domain?: [string, string];
   width?: number;
   height?: number;
 }
 
 const Prediction: React.FC<PredictionChartProps> = ({
   data,
+  domain,
   width = 1100,
   height = 350,
 }) => {
@@ -22,11 +25,18 @@ const Prediction: React.FC<PredictionChartProps> = ({
   const [chartReady, setChartReady] = React.useState(false);
 
   useEffect(() => {
-    if (!data || data.length === 0) return;
-
     setChartReady(false);
 
-    d3.select(svgRef.current).selectAll("*").remove();
+    const svg = d3
+      .select(svgRef.current)
+      .attr("width", width)
+      .attr("height", height);
+
+    svg.selectAll("*").remove();
+
+    // Nothing to draw yet (e.g. a streamed forecast before its first points);
+    // keep the placeholder at full chart size
+    if (!data || data.length === 0) return;
 
     const margin = { top: 50, right: 40, bottom: 80, left: 70 };
     const w = width - margin.left - margin.right;
@@ -37,9 +47,13 @@ const Prediction: React.FC<PredictionChartProps> = ({
       dateObj: new Date(d.date),
     }));
 
+    const xDomain = domain
+      ? [new Date(domain[0]), new Date(domain[1])]
+      : (d3.extent(parsedData, (d) => d.dateObj) as [Date, Date]);
+
     const xScale = d3
       .scaleTime()
-      .domain(d3.extent(parsedData, (d) => d.dateObj) as [Date, Date])
+      .domain(xDomain)
       .range([0, w]);
 
     const yScale = d3
@@ -48,11 +62,6 @@ const Prediction: React.FC<PredictionChartProps> = ({
       .range([h, 0])
       .nice();
 
-    const svg = d3
-      .select(svgRef.current)
-      .attr("width", width)
-      .attr("height", height);
-
     const chart = svg
       .append("g")
       .attr("transform", `translate(${margin.left},${margin.top})`);
@@ -63,8 +72,8 @@ const Prediction: React.FC<PredictionChartProps> = ({
 
     // ******** STRICT 7-DAY LABELS ********
     const weeklyTicks: Date[] = [];
-    let cursor = parsedData[0].dateObj;
-    const lastDate = parsedData[parsedData.length - 1].dateObj;
+    let cursor = xDomain[0];
+    const lastDate = xDomain[1];
 
     while (cursor <= lastDate) {
       weeklyTicks.push(new Date(cursor));
@@ -189,7 +198,7 @@ const Prediction: React.FC<PredictionChartProps> = ({
     setChartReady(true);
 
     return () => tooltip.remove();
-  }, [data, width, height]);
+  }, [data, domain?.[0], domain?.[1], width, height]);
 
   return (
     <div className="w-full overflow-x-auto relative">
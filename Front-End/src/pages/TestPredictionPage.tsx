@@ -133,8 +133,23 @@ export const TestPredictionPage: React.FC = () => {
     // -------- END VALIDATION --------
 
     try {
-      const response = await aqiApi.predict(formData);
-      setResult(response.data);
+      // Stream the forecast so the chart fills in chunk by chunk
+      await aqiApi.predictStream(formData, (frame) => {
+        if (frame.type === "meta") {
+          setResult({
+            start_date: frame.start_date,
+            end_date: frame.end_date,
+            mode: frame.mode,
+            predictions: [],
+          });
+        } else if (frame.type === "points") {
+          setResult((prev) =>
+            prev && { ...prev, predictions: [...prev.predictions, ...frame.predictions] }
+          );
+        } else if (frame.type === "error") {
+          throw new Error(frame.detail);
+        }
+      });
     } catch (err: any) {
       // Extract error message from response
       const errorMsg = err.response?.data?.details || 
@@ -147,8 +162,9 @@ export const TestPredictionPage: React.FC = () => {
   };
 
   const chartData = useMemo(() => {
-    // If real-time prediction exists → use it
-    if (result?.predictions?.length) {
+    // If a real-time prediction has started → use it, even before its
+    // first points arrive (the regression sample is a different forecast)
+    if (result) {
       return result.predictions.map(p => ({
         date: p.date,
         aqi: Math.round(p.aqi),
@@ -246,9 +262,14 @@ export const TestPredictionPage: React.FC = () => {
           </div>
         </Card>
       ) : (
-        chartData.length > 0 && (
+        (result || chartData.length > 0) && (
           <Card className="p-6 mb-6">
-            <Prediction data={chartData} width={1200} height={350} />
+            <Prediction
+              data={chartData}
+              domain={result ? [result.start_date, result.end_date] : undefined}
+              width={1200}
+              height={350}
+            />
           </Card>
         )
       )}
@@ -22,8 +22,12 @@ export interface PredictionRequest {
   relative_humidity: number;
   wind_speed: number;
   date?: string;
+  mode?: ForecastMode;
 }
 
+// recursive: one model, day-by-day; direct: horizon-bucketed models
+export type ForecastMode = 'recursive' | 'direct';
+
 export interface PredictionResponse {
   success: boolean;
   predicted_aqi: number;
@@ -47,10 +51,26 @@ export interface MultiDayPredictionResponse {
   success?: boolean; // Optional - backend doesn't return this
   start_date: string;
   end_date: string;
+  mode?: ForecastMode;
   predictions: DailyPrediction[];
   monthly_averages?: MonthlyAverage[]; // Optional - backend doesn't return this
 }
 
+// Frames sent by /api/predict/stream (one JSON object per line)
+export type PredictionStreamFrame =
+  | {
+      type: 'meta';
+      start_date: string;
+      end_date: string;
+      days: number;
+      mode: ForecastMode;
+      model_version: number;
+      cache: 'hit' | 'miss';
+    }
+  | { type: 'points'; offset: number; predictions: DailyPrediction[] }
+  | { type: 'done'; first_point_ms: number; total_ms: number }
+  | { type: 'error'; detail: string };
+
 export type AQICategory = 'Good' | 'Moderate' | 'Unhealthy for Sensitive Groups' | 'Unhealthy' | 'Very Unhealthy' | 'Hazardous';
 
 export type Country = 'Malaysia' | 'Thailand' | 'Singapore';